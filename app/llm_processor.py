@@ -1,282 +1,271 @@
-import openai
-from typing import Dict, Any
+import asyncio
+import functools
+import httpx
+from openai import AsyncOpenAI
+from typing import Dict, Any, List, Literal, Optional
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import json
+import orjson
 import re
+import string
+from collections import OrderedDict
+
+from .semantic_cache import semantic_cache
 
 load_dotenv()
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Raw LLM responses keyed by the exact user input, in least recently used order
+EXACT_CACHE_SIZE = 4096
+_exact_cache: "OrderedDict[str, str]" = OrderedDict()
+
+# Shared async client so connections are reused across requests. It is created on first use,
+# so a missing OPENAI_API_KEY only fails LLM calls instead of the whole app import
+_client: Optional[AsyncOpenAI] = None
+
+def get_client() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=50, max_connections=100, keepalive_expiry=60)
+            ),
+            # Connection errors, timeouts and 429/5xx responses are retried with exponential backoff
+            max_retries=3
+        )
+    return _client
+
+async def close_client():
+    """Close the shared client and its connection pool, if it was ever created"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+# Patterns used on every request, compiled once
+_DURATION_RE = re.compile(r'(\d+)\s*h(?:ours?|rs?)\b', re.I)
+_ACTION_FIELD_RE = re.compile(r'"action"\s*:\s*"(\w+)"')
+_FILTERS_KEY_RE = re.compile(r',\s*"filters"\s*:')
+_NON_CREATE_RE = re.compile(
+    r'^(?:show|list|get|find|what|which|any|display|sort|filter|delete|remove|cancel|mark|update|change|rename)\b',
+    re.I
+)
+
+# Action and filler words removed from input by the fallback extraction
+_ACTION_WORDS = frozenset({
+    "add", "create", "delete", "remove", "update", "change", "complete", "finish", "done",
+    "must", "should", "task", "todo"
+})
+_ACTION_PHRASES = frozenset({("need", "to"), ("have", "to"), ("want", "to"), ("going", "to")})
+
+# Title casing: every word is capitalized except short connecting words after the first
+_TITLE_WORD_RE = re.compile(r"[\w']+")
+_TITLE_LOWER_WORDS = frozenset({
+    "a", "an", "and", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with"
+})
+
+# Simple commands that are answered without the LLM. Free-text deletes, renames and completions
+# always go through the LLM, since their title cannot be told apart from the rest of the sentence
+_INTENT_PATTERNS = [
+    (re.compile(r'^(?:show|list|get)\s+(?:all\s+)?(?:my\s+)?todos?$', re.I), "list_all", "refresh_list"),
+]
+
+# Structured commands sent by the UI buttons with exact titles, and the UI action of each
+COMMAND_UI_ACTIONS = {
+    "mark_complete": "update_item",
+    "mark_incomplete": "update_item",
+    "update": "update_item",
+    "delete": "remove_item"
+}
+
+class TodoItem(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    title: str
+    description: Optional[str]
+    due_date: Optional[str]
+    due_in_hours: Optional[float]
+    priority: Literal[1, 2, 3]
+    category: Optional[str]
+
+class TodoFilters(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    completed: Optional[bool]
+    category: Optional[str]
+    priority: Optional[Literal[1, 2, 3]]
+    due_date_before: Optional[str]
+    due_date_after: Optional[str]
+
+class ViewOptions(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    sort_by: Optional[Literal["priority", "due_date", "created_at"]]
+    sort_order: Optional[Literal["asc", "desc"]]
+    show_completed: Optional[bool]
+
+class TodoAction(BaseModel):
+    """Schema the LLM response must follow"""
+    model_config = ConfigDict(extra="forbid")
+
+    action: Literal["create", "update", "delete", "query", "mark_complete", "mark_incomplete", "list_all"]
+    ui_action: Literal[
+        "refresh_list", "add_item", "remove_item", "update_item", "clear_list", "show_filtered", "highlight_item"
+    ]
+    todos: List[TodoItem]
+    filters: TodoFilters
+    view_options: ViewOptions
+
+# Static parts of the LLM request, built once instead of on every call
+_SYSTEM_MSG = """You are a precise todo list analyzer that excels at extracting tasks from natural language.
+
+Important things to remember:
+    Remember, The user can give the very complex instructions or not random query or veg, you need to understand what task is given for.
+    Also remember from the query, you need to extract the title of the task.
+
+Critical Rules:
+1. For NEW tasks:
+   - Keep important context (location, person, specific details)
+   - Example: "need to meet friend at labim mall" → "Meet Friend at Labim Mall"
+   - Example: "have to buy groceries from walmart" → "Buy Groceries from Walmart"
+
+2. For COMPLETED tasks:
+   - Match the exact task as it was created
+   - Example: "met the friend at labim mall" should match "Meet Friend at Labim Mall"
+   - Example: "bought groceries from walmart" should match "Buy Groceries from Walmart"
+
+3. Time Handling:
+   - Preserve time information in structured format
+   - Example: "meet john in 2hrs at cafe" → title: "Meet John at Cafe", due_in_hours: 2
+   - Example: "meeting in 2hrs" → title: "Meeting", due_in_hours: 2
+   - Example: "meeting at 2pm or any specific time" → title: "Meeting in 2Pm", due_in_hours: 2PM from now
+   - Example: "tomorrow morning buy milk" → title: "Buy Milk", due_date: [tomorrow morning]
+
+4. Context Preservation:
+   - Keep locations: "at [place]", "in [location]", "from [place]"
+   - Keep people: "with [person]", "friend", "mom", etc.
+   - Keep specific details that make the task unique
+
+5. Title Formatting:
+   - Capitalize each word properly
+   - Keep prepositions (at, in, from, etc.) when they refer to locations
+   - Remove unnecessary words but preserve context
+
+Examples of Perfect Handling:
+Input: "need to meet the friend at labim mall"
+Output: title: "Meet Friend at Labim Mall"
+
+Input: "i met the friend at labim mall"
+Action: mark_complete
+Match: "Meet Friend at Labim Mall"
+
+Input: "have to buy groceries from walmart today evening"
+Output: title: "Buy Groceries from Walmart", due_date: [today evening]
+"""
+
+_PROMPT = """Classify the user's todo list request and extract the tasks it mentions. The user can give complex or vague instructions; work out which task is meant and extract its title.
+
+Actions: create (need to, have to, should, must, want to, going to), update (change/rename X to Y: todos[0] is the current task, todos[1] the new one), delete (remove, get rid of, cancel), query (show, find, list matching), mark_complete (done, finished, completed, already), mark_incomplete (can't do, not done, pending), list_all.
+UI actions: refresh_list, add_item, remove_item, update_item, clear_list, show_filtered, highlight_item.
+Priority: 1 = Low, 2 = Medium, 3 = High.
+Dates use the format YYYY-MM-DD HH:mm:ss. Use null for anything the user did not specify.
+When the action is create and an "Items" array is given, return exactly one entry in "todos" per item, in the same order. For any other action, ignore "Items".
+The user message contains only the user's input.
+"""
+
+# The whole static prompt goes in the system message, so the user input is sent exactly once
+_MESSAGES_HEAD = ({"role": "system", "content": _SYSTEM_MSG + "\n" + _PROMPT},)
+
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "TodoAction",
+        "schema": TodoAction.model_json_schema(),
+        "strict": True
+    }
+}
 
 class TodoAnalyzer:
     @staticmethod
-    def analyze_input(user_input: str) -> Dict[str, Any]:
+    async def read_stream(stream) -> str:
+        """
+        Accumulate a streamed response, stopping as soon as everything the action needs has arrived
+        """
+        content = ""
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            content += chunk.choices[0].delta.content
+
+            # Fields are generated in schema order, so once the model reaches "filters"
+            # the todos are complete; only queries need the filters and view options
+            stop = _FILTERS_KEY_RE.search(content)
+            if stop:
+                action = _ACTION_FIELD_RE.search(content)
+                if action and action.group(1) != "query":
+                    await stream.close()
+                    return content[:stop.start()] + "}"
+
+        # A refusal has no content and drops through to the fallback extraction
+        return content.strip()
+
+    @staticmethod
+    async def analyze_input(user_input: str) -> Dict[str, Any]:
         """
-        Analyze user input using GPT to determine the action and extract relevant information
+        Analyze user input using the LLM to determine the action and extract relevant information
         """
-        prompt = f"""You are an intelligent Todo List Management Assistant. Analyze the user's natural language input and generate a structured response. Understand context and implied actions. 
-        Remember, The user can give the very complex instructions or not random query or veg, you need to understand what task is given for.
-        Also remember from the query, you need to extract the title of the task.
-
-You must respond with ONLY a valid JSON object (no other text).
-
-User Input: "{user_input}"
-
-Response Format:
-{{
-    "action": "<action_type>",
-    "ui_action": "<ui_update_type>",
-    "todos": [
-        {{
-            "title": "task title",
-            "description": "task description or null",
-            "due_date": "YYYY-MM-DD HH:mm:ss or null",
-            "due_in_hours": number or null,
-            "priority": 1|2|3,
-            "category": "category name or null"
-        }}
-    ],
-    "filters": {{
-        "completed": true|false|null,
-        "category": "category name or null",
-        "priority": 1|2|3|null,
-        "due_date_before": "YYYY-MM-DD or null",
-        "due_date_after": "YYYY-MM-DD or null"
-    }},
-    "view_options": {{
-        "sort_by": "priority|due_date|created_at|null",
-        "sort_order": "asc|desc|null",
-        "show_completed": true|false|null
-    }}
-}}
-
-Action Types:
-1. "create" - Create a new todo (Keywords: need to, have to, should, must, want to, going to)
-2. "update" - Update/modify/change existing todo
-3. "delete" - Delete/remove todo
-4. "query" - List/filter/show/find todos
-5. "mark_complete" - Mark as done/finished/completed/ready
-6. "mark_incomplete" - Mark as not done/pending/incomplete
-7. "list_all" - Show all todos
-
-Task Extraction Examples:
-- "Need to buy groceries" → create, title="Buy Groceries"
-- "Have to finish report by tomorrow" → create with due_date
-- "Already completed the report" → mark_complete for "report"
-- "Need to change meeting to presentation" → update "meeting" to "presentation"
-- "Can't do the gym today" → mark_incomplete for "gym"
-- "Get rid of dentist appointment" → delete "dentist appointment"
-- "Support need to buy veggies" → create, title="Buy Veggies"
-
-UI Action Types:
-1. "refresh_list" - Refresh the entire todo list
-2. "add_item" - Add new item to the list
-3. "remove_item" - Remove item from the list
-4. "update_item" - Update existing item
-5. "clear_list" - Clear the list
-6. "show_filtered" - Show filtered results
-7. "highlight_item" - Highlight specific item
-
-Understanding Natural Language:
-
-1. Creation Patterns:
-   - "Need to X" → create task "X"
-   - "Have to X" → create task "X"
-   - "Should X" → create task "X"
-   - "Must X" → create task "X"
-   - "Going to X" → create task "X"
-   - "Want to X" → create task "X"
-   - "Support need to X" → create task "X"
-   - "X for tomorrow" → create task "X" with due_date
-
-2. Completion Patterns:
-   - "X is done" → mark_complete for "X"
-   - "Finished X" → mark_complete for "X"
-   - "Completed X" → mark_complete for "X"
-   - "X is ready" → mark_complete for "X"
-   - "Already X" → mark_complete for "X"
-
-3. Incomplete Patterns:
-   - "Can't do X" → mark_incomplete for "X"
-   - "Not done with X" → mark_incomplete for "X"
-   - "Still need to X" → mark_incomplete for "X"
-   - "X is pending" → mark_incomplete for "X"
-
-4. Update/Change Patterns:
-   - "Change X to Y" → update task "X" to "Y"
-   - "Rename X to Y" → update task "X" to "Y"
-   - "Update X to Y" → update task "X" to "Y"
-   - "X should be Y" → update task "X" to "Y"
-
-5. Delete Patterns:
-   - "Remove X" → delete task "X"
-   - "Delete X" → delete task "X"
-   - "Get rid of X" → delete task "X"
-   - "Cancel X" → delete task "X"
-   - "Don't need X anymore" → delete task "X"
-
-6. Query Patterns:
-   - "Show X" → query tasks matching "X"
-   - "Find X" → query tasks matching "X"
-   - "List X" → query tasks matching "X"
-   - "What X" → query tasks matching "X"
-   - "Any X" → query tasks matching "X"
-
-Priority Levels:
-1 = Low
-2 = Medium
-3 = High
-
-Remember:
-1. Always include all required fields
-2. Use null for missing/unspecified values
-3. Dates must be in YYYY-MM-DD format
-4. Return ONLY the JSON object, no additional text"""
+        # Skip the LLM entirely for simple, unambiguous commands
+        matched = TodoAnalyzer.match_intent(user_input)
+        if matched is not None:
+            return matched
+
+        todo_items = TodoAnalyzer.split_items(user_input)
+        prompt = user_input
+        # Items only matter for creating several todos at once; a comma in a query is just punctuation
+        if len(todo_items) > 1 and not _NON_CREATE_RE.match(user_input.strip()):
+            prompt += f"\nItems: {json.dumps(todo_items)}"
+        
+        # Identical inputs reuse the raw response; temperature 0 makes the call deterministic
+        content = _exact_cache.get(user_input)
+        if content is not None:
+            _exact_cache.move_to_end(user_input)
+            return TodoAnalyzer.postprocess(orjson.loads(content), user_input)
         
         try:
+            # Serve paraphrased or repeated inputs from the semantic cache
+            embedding = None
+            if semantic_cache.enabled:
+                # Encoding is CPU-bound, so keep it off the event loop
+                embedding = await asyncio.to_thread(semantic_cache.embed, user_input)
+            cached = semantic_cache.lookup(embedding, user_input)
+            if cached is not None:
+                return TodoAnalyzer.postprocess(cached, user_input)
             
-            # Use GPT-4 for better natural language understanding
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": """You are a precise todo list analyzer that excels at extracting tasks from natural language.
-
-                        Important things to remember:
-                            Remember, The user can give the very complex instructions or not random query or veg, you need to understand what task is given for.
-                            Also remember from the query, you need to extract the title of the task.
-                                            
-                        Critical Rules:
-                        1. For NEW tasks:
-                           - Keep important context (location, person, specific details)
-                           - Example: "need to meet friend at labim mall" → "Meet Friend at Labim Mall"
-                           - Example: "have to buy groceries from walmart" → "Buy Groceries from Walmart"
-                        
-                        2. For COMPLETED tasks:
-                           - Match the exact task as it was created
-                           - Example: "met the friend at labim mall" should match "Meet Friend at Labim Mall"
-                           - Example: "bought groceries from walmart" should match "Buy Groceries from Walmart"
-                        
-                        3. Time Handling:
-                           - Preserve time information in structured format
-                           - Example: "meet john in 2hrs at cafe" → title: "Meet John at Cafe", due_in_hours: 2
-                           - Example: "meeting in 2hrs" → title: "Meeting", due_in_hours: 2
-                           - Example: "meeting at 2pm or any specific time" → title: "Meeting in 2Pm", due_in_hours: 2PM from now
-                           - Example: "tomorrow morning buy milk" → title: "Buy Milk", due_date: [tomorrow morning]
-                
-                        
-                        4. Context Preservation:
-                           - Keep locations: "at [place]", "in [location]", "from [place]"
-                           - Keep people: "with [person]", "friend", "mom", etc.
-                           - Keep specific details that make the task unique
-                        
-                        5. Title Formatting:
-                           - Capitalize each word properly
-                           - Keep prepositions (at, in, from, etc.) when they refer to locations
-                           - Remove unnecessary words but preserve context
-                        
-                        Examples of Perfect Handling:
-                        Input: "need to meet the friend at labim mall"
-                        Output: title: "Meet Friend at Labim Mall"
-                        
-                        Input: "i met the friend at labim mall"
-                        Action: mark_complete
-                        Match: "Meet Friend at Labim Mall"
-                        
-                        Input: "have to buy groceries from walmart today evening"
-                        Output: title: "Buy Groceries from Walmart", due_date: [today evening]
-                        """
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt + f'\nUser Input: "{user_input}"'
-                    }
-                ],
-                temperature=0
+            # Structured outputs guarantee a response matching the TodoAction schema
+            stream = await get_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[*_MESSAGES_HEAD, {"role": "user", "content": prompt}],
+                response_format=_RESPONSE_FORMAT,
+                temperature=0,
+                stream=True
             )
-            content = response['choices'][0]['message']['content'].strip()
+            content = await TodoAnalyzer.read_stream(stream)
             try:
-                parsed = json.loads(content)
-                
-                # Handle all actions that require todos array
-                if "todos" not in parsed:
-                    parsed["todos"] = []
-                    
-                if parsed.get("action") == "create":
-                    if "," in user_input:
-                        # Split multiple todos
-                        todo_items = [item.strip() for item in user_input.split(",")]
-                    else:
-                        todo_items = [user_input]
-                    
-                    todos = []
-                    from datetime import datetime, timedelta
-                    
-                    for item in todo_items:
-                        # Get the task details from GPT-4's response
-                        todo_data = parsed.get("todos", [{}])[0]
-                        title = todo_data.get("title", item.strip())
-                        
-                        # Preserve original format for matching with completions later
-                        title = " ".join(word.capitalize() for word in title.split())
-                        
-                        # Preserve any additional context from GPT-4's analysis
-                        description = todo_data.get("description", title)
-                        category = todo_data.get("category")
-                        priority = todo_data.get("priority", 1)
-                        
-                        todo = {
-                            "title": title,
-                            "description": description,
-                            "due_date": todo_data.get("due_date"),
-                            "priority": priority,
-                            "category": category
-                        }
-
-                        # Process time duration for due date
-                        time_match = re.search(r'(\d+)\s*(hr|hour|hrs|hours)', item.lower())
-                        if time_match:
-                            try:
-                                hours = int(time_match.group(1))
-                                due_time = datetime.now() + timedelta(hours=hours)
-                                todo["due_date"] = due_time.strftime("%Y-%m-%d %H:%M:%S")
-                                todo["description"] = f"{title.capitalize()} (Due in {hours} hours)"
-                            except ValueError:
-                                pass
-                        
-                        todos.append(todo)
-                    
-                    parsed["todos"] = todos
-                    if "ui_action" not in parsed:
-                        parsed["ui_action"] = "add_item"
-                    
-                return parsed
-            except json.JSONDecodeError as e:
+                parsed = orjson.loads(content)
+                TodoAnalyzer.remember(user_input, content)
+                semantic_cache.add(embedding, user_input, parsed)
+                return TodoAnalyzer.postprocess(parsed, user_input)
+            except (orjson.JSONDecodeError, ValueError) as e:
                 print(f"LLM returned invalid JSON, using fallback extraction")
                 # Simple fallback - just try to extract a task
                 clean_text = user_input.lower()
                 
-                # Basic cleanup for fallback
-                def basic_cleanup(text):
-                    # Remove common action and filler words
-                    action_words = ["add", "create", "delete", "remove", "update", "change", 
-                                  "complete", "finish", "done", "need to", "have to", "must", 
-                                  "should", "want to", "going to", "task", "todo"]
-                    
-                    text = text.lower()
-                    for word in action_words:
-                        text = re.sub(r'\b' + word + r'\b', '', text)
-                    
-                    # Clean up whitespace and punctuation
-                    text = re.sub(r'\s+', ' ', text).strip()
-                    text = re.sub(r'^\W+|\W+$', '', text)
-                    return text
-                
                 # Clean the text and determine action
-                task_name = basic_cleanup(clean_text)
+                task_name = TodoAnalyzer.basic_cleanup(clean_text)
                 action_word = "create"  # Default to create
                 
                 # Simple action detection
@@ -286,7 +275,7 @@ Remember:
                     action_word = "mark_complete"
                 
                 # Capitalize the task name
-                task_name = task_name.strip().capitalize()
+                task_name = TodoAnalyzer.format_title(task_name)
                 
                 if action_word and task_name:
                     return {
@@ -311,4 +300,151 @@ Remember:
                 "action": "error",
                 "error": "An error occurred while processing your request. Please try again.",
                 "details": str(e)
-            }
\ No newline at end of file
+            }
+
+    @staticmethod
+    def postprocess(parsed: Dict[str, Any], user_input: str) -> Dict[str, Any]:
+        """
+        Normalize a parsed LLM response and expand created todos for the given input
+        """
+        # Handle all actions that require todos array
+        if "todos" not in parsed:
+            parsed["todos"] = []
+            
+        if parsed.get("action") == "create":
+            todo_items = TodoAnalyzer.split_items(user_input)
+            # The LLM returns one todo per item, aligned by index
+            todos_data = parsed["todos"]
+            
+            todos = []
+            
+            for i, item in enumerate(todo_items):
+                todo_data = todos_data[i] if i < len(todos_data) else {}
+                title = todo_data.get("title") or item
+                
+                # Preserve original format for matching with completions later
+                title = TodoAnalyzer.format_title(title)
+                
+                # Preserve any additional context from the LLM's analysis
+                description = todo_data.get("description", title)
+                category = todo_data.get("category")
+                priority = todo_data.get("priority", 1)
+                
+                todo = {
+                    "title": title,
+                    "description": description,
+                    "due_date": todo_data.get("due_date"),
+                    "priority": priority,
+                    "category": category
+                }
+
+                # Process time duration for due date
+                time_match = _DURATION_RE.search(item)
+                if time_match:
+                    try:
+                        hours = int(time_match.group(1))
+                        due_time = datetime.now() + timedelta(hours=hours)
+                        todo["due_date"] = due_time.strftime("%Y-%m-%d %H:%M:%S")
+                        todo["description"] = f"{title.capitalize()} (Due in {hours} hours)"
+                    except ValueError:
+                        pass
+                
+                todos.append(todo)
+            
+            parsed["todos"] = todos
+            if "ui_action" not in parsed:
+                parsed["ui_action"] = "add_item"
+            
+        return parsed
+
+    @staticmethod
+    def remember(user_input: str, content: str):
+        """
+        Store a raw LLM response in the exact-match cache, evicting the least recently used entry
+        """
+        _exact_cache[user_input] = content
+        _exact_cache.move_to_end(user_input)
+        if len(_exact_cache) > EXACT_CACHE_SIZE:
+            _exact_cache.popitem(last=False)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def basic_cleanup(text: str) -> str:
+        """
+        Strip action and filler words from fallback input, leaving the task name
+        """
+        # Remove common action and filler words in a single pass over the tokens
+        tokens = text.lower().split()
+        kept = []
+        i = 0
+        while i < len(tokens):
+            word = tokens[i].strip(string.punctuation)
+            if i + 1 < len(tokens) and (word, tokens[i + 1].strip(string.punctuation)) in _ACTION_PHRASES:
+                i += 2
+                continue
+            if word not in _ACTION_WORDS:
+                kept.append(tokens[i])
+            i += 1
+        
+        # Splitting already collapsed whitespace; drop leftover punctuation at the edges
+        return " ".join(kept).strip(string.punctuation + string.whitespace)
+
+    @staticmethod
+    def format_title(title: str) -> str:
+        """
+        Title-case a task title in one pass, keeping prepositions like at/in/from lower case
+        """
+        return _TITLE_WORD_RE.sub(TodoAnalyzer._format_title_word, title.strip())
+
+    @staticmethod
+    def _format_title_word(match: re.Match) -> str:
+        word = match.group(0)
+        if match.start() and word.lower() in _TITLE_LOWER_WORDS:
+            return word.lower()
+        return word.capitalize()
+
+    @staticmethod
+    def split_items(user_input: str) -> List[str]:
+        """
+        Split comma separated input into individual todo items
+        """
+        items = [item.strip() for item in user_input.split(",")]
+        return [item for item in items if item] or [user_input.strip()]
+
+    @staticmethod
+    def match_intent(user_input: str) -> Optional[Dict[str, Any]]:
+        """
+        Build the analysis for inputs matching a simple command pattern, or None if none match
+        """
+        text = user_input.strip()
+        for pattern, action, ui_action in _INTENT_PATTERNS:
+            match = pattern.match(text)
+            if not match:
+                continue
+
+            # Titles are matched case-insensitively, so they are kept as the user typed them
+            titles = [title.strip() for title in match.groupdict().values() if title]
+            return TodoAnalyzer.command_analysis(action, ui_action, titles)
+        return None
+
+    @staticmethod
+    def command_analysis(action: str, ui_action: str, titles: List[str]) -> Dict[str, Any]:
+        """
+        Build the analysis for a command whose titles are already known, in the same shape the LLM returns
+        """
+        return {
+            "action": action,
+            "ui_action": ui_action,
+            "todos": [
+                {
+                    "title": title,
+                    "description": None,
+                    "due_date": None,
+                    "priority": 1,
+                    "category": None
+                }
+                for title in titles
+            ],
+            "filters": {},
+            "view_options": {}
+        }
\ No newline at end of file
@@ -1,39 +1,48 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import and_, insert, or_, select
 from sqlalchemy.orm import Session
-from . import models, database, auth
-from .llm_processor import TodoAnalyzer
+from . import models, database, auth, llm_processor
+from .llm_processor import TodoAnalyzer, COMMAND_UI_ACTIONS
+from .semantic_cache import semantic_cache
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, ORJSONResponse
 from fastapi import Request
 from datetime import datetime, timedelta
 from typing import Optional
 from pydantic import BaseModel
+from contextlib import asynccontextmanager, closing
 
 class TodoRequest(BaseModel):
     user_input: str
+    # Set by the UI buttons, which already know the todo and skip the LLM
+    action: Optional[str] = None
+    todo_id: Optional[int] = None
+    new_title: Optional[str] = None
 
 class Token(BaseModel):
     access_token: str
     token_type: str
     username: str
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables and initial users
+    models.Base.metadata.create_all(bind=database.engine)
+    with closing(database.SessionLocal()) as db:
+        auth.create_initial_users(db)
+    yield
+    # Persist the semantic cache so it survives restarts
+    semantic_cache.save()
+    await llm_processor.close_client()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
-# Remove old database file and create new tables
-import os
-if os.path.exists("todos.db"):
-    os.remove("todos.db")
-
-# Create tables and initial users
-models.Base.metadata.create_all(bind=database.engine)
-auth.create_initial_users(next(database.get_db()))
-
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
@@ -63,25 +72,55 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     )
     return {"access_token": access_token, "token_type": "bearer", "username": user.username}
 
-def find_matching_todo(db: Session, title: str, user_id: int):
-    """Find a todo by fuzzy matching the title"""
+# Common words that say nothing about which todo is meant; "all" alone matches "Call Mom"
+MATCH_STOPWORDS = frozenset({
+    "the", "and", "all", "any", "for", "from", "with", "into", "onto", "about", "this", "that",
+    "these", "those", "my", "our", "your", "their", "its", "are", "was", "were", "not", "but",
+    "has", "have", "had", "some", "every", "todo", "todos", "task", "tasks", "item", "items"
+})
+
+def find_matching_todo(db: Session, title: str, user_id: int, any_word: bool = True):
+    """
+    Find a todo by fuzzy matching the title. With any_word=False a todo must contain every
+    significant word of the title, never just one of them.
+    """
     # Try exact match first
+    todo = db.query(models.Todo).filter(
+        models.Todo.title == title,
+        models.Todo.user_id == user_id
+    ).first()
+    if todo:
+        return todo
+
+    # A title made only of stopwords would fuzzy-match unrelated todos
+    if all(word in MATCH_STOPWORDS for word in title.lower().split()):
+        return None
+
     todo = db.query(models.Todo).filter(
         models.Todo.title.ilike(f"%{title}%"),
         models.Todo.user_id == user_id
     ).first()
     
     if not todo:
-        # Try partial match
-        title_words = title.lower().split()
-        todos = db.query(models.Todo).filter(
-            models.Todo.user_id == user_id
-        ).all()
+        # Try partial match on the significant words, evaluated by the database
+        conditions = [
+            models.Todo.title.ilike(f"%{word}%")
+            for word in title.lower().split()
+            if len(word) > 2 and word not in MATCH_STOPWORDS
+        ]
+        if not conditions:
+            return None
         
-        for t in todos:
-            todo_title = t.title.lower()
-            if any(word in todo_title for word in title_words):
-                return t
+        # A todo containing all of the words first, then (if allowed) any of them
+        todo = db.query(models.Todo).filter(
+            models.Todo.user_id == user_id,
+            and_(*conditions)
+        ).first()
+        if not todo and any_word and len(conditions) > 1:
+            todo = db.query(models.Todo).filter(
+                models.Todo.user_id == user_id,
+                or_(*conditions)
+            ).first()
     
     return todo
 
@@ -91,9 +130,13 @@ async def process_input(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    if todo_request.action:
+        analysis = command_analysis(todo_request, db, current_user)
+        return ACTION_HANDLERS[analysis["action"]](analysis, todo_request.user_input, db, current_user)
+
     try:
         # Analyze user input using LLM
-        analysis = TodoAnalyzer.analyze_input(todo_request.user_input)
+        analysis = await TodoAnalyzer.analyze_input(todo_request.user_input)
         
         if not analysis:
             return {"todos": [], "error": "Failed to process your request. Please try again."}
@@ -113,172 +156,220 @@ async def process_input(
     except Exception as e:
         return {"todos": [], "error": f"Failed to process request: {str(e)}"}
     
-    if analysis["action"] == "create":
-        try:
-            # Log the analysis for debugging
-            print(f"Analysis: {analysis}")
-            # Handle multiple todos from the analysis
-            todos_to_create = analysis.get("todos", [])
-            if not todos_to_create and "todo_info" in analysis:
-                # Fallback: create single todo from todo_info
-                todos_to_create = [{
-                    "title": analysis["todo_info"]["title"],
-                    "description": analysis["todo_info"]["description"],
-                    "due_date": analysis["todo_info"]["due_date"],
-                    "priority": analysis["todo_info"]["priority"]
-                }]
-            elif not todos_to_create:
-                todos_to_create = [{
-                    "title": todo_request.user_input,
-                    "description": todo_request.user_input,
-                    "due_date": None,
-                    "priority": 1
-                }]
-            
-            # Create all todos
-            for todo_info in todos_to_create:
-                todo = models.Todo(
-                    title=todo_info["title"],
-                    description=todo_info.get("description"),
-                    user_id=current_user.id,
-                    priority=todo_info.get("priority", 1),
-                    completed=False
-                )
-                
-                # Handle due date if present
-                if todo_info.get("due_date"):
-                    todo.due_date = datetime.strptime(todo_info["due_date"], "%Y-%m-%d %H:%M:%S")
-                
-                db.add(todo)
-            
-            db.commit()
-            
-            todos = get_filtered_todos(db, {}, {}, current_user)
-            count = len(todos_to_create)
-            todos["message"] = f"Created {count} {'todo' if count == 1 else 'todos'} successfully"
-            return todos
-            
-        except Exception as e:
-            print(f"Error creating todo: {str(e)}")
-            db.rollback()
-            return {"todos": [], "error": "Failed to create todo. Please try again."}
-    
-    elif analysis["action"] in ["mark_complete", "mark_incomplete"]:
-        # Update todo completion status
-        print(f"Processing completion status: {analysis}")
-        todos = analysis.get("todos", [])
-        if not todos:
-            print("No todos found in analysis")
-            if "todo_info" in analysis:
-                todo_title = analysis["todo_info"]["title"]
-            else:
-                # Extract title from user input for completion
-                user_input = todo_request.user_input.lower()
-                words_to_remove = ["mark", "as", "complete", "completed", "incomplete", "done", "todo", "task"]
-                for word in words_to_remove:
-                    user_input = user_input.replace(word, "")
-                todo_title = user_input.strip().capitalize()
-        else:
-            todo_title = todos[0]["title"]
+    handler = ACTION_HANDLERS.get(analysis["action"])
+    if handler is None:
+        raise HTTPException(status_code=400, detail="Invalid action")
+    return handler(analysis, todo_request.user_input, db, current_user)
 
-        print(f"Looking for todo with title: {todo_title}")
-        todo = find_matching_todo(db, todo_title, current_user.id)
-        
-        if not todo:
-            print(f"Todo not found with title: {todo_title}")
-            raise HTTPException(status_code=404, detail=f"Todo not found: {todo_title}")
-        
-        todo.completed = analysis["action"] == "mark_complete"
-        db.commit()
-        return get_todos_response(db, f"Todo marked as {analysis['action'].replace('mark_', '')}", current_user)
-    
-    elif analysis["action"] == "update":
-        # Update existing todo
-        todo_info = analysis["todo_info"]
-        todo = db.query(models.Todo).filter(models.Todo.title == todo_info["title"]).first()
-        if not todo:
-            raise HTTPException(status_code=404, detail="Todo not found")
-        
-        # Update fields
-        for key, value in todo_info.items():
-            if value is not None and hasattr(todo, key):
-                if key == "due_date" and value:
-                    value = datetime.fromisoformat(value)
-                setattr(todo, key, value)
-        
-        db.commit()
-        return get_todos_response(db, "Todo updated successfully", current_user)
+def command_analysis(todo_request: TodoRequest, db: Session, current_user: models.User) -> dict:
+    """Build the analysis for a structured UI command, which names its todo by id"""
+    ui_action = COMMAND_UI_ACTIONS.get(todo_request.action)
+    if ui_action is None:
+        raise HTTPException(status_code=400, detail="Invalid action")
+    if todo_request.todo_id is None:
+        raise HTTPException(status_code=400, detail="Missing todo id")
 
-    elif analysis["action"] == "update":
-        # Update todo title
-        todos = analysis.get("todos", [])
-        if not todos or len(todos) < 2:
-            raise HTTPException(status_code=400, detail="Missing update information")
-            
-        old_title = todos[0]["title"]
-        new_title = todos[1]["title"]
-        
-        # Find and update the todo
-        todo = find_matching_todo(db, old_title, current_user.id)
-        if not todo:
-            raise HTTPException(status_code=404, detail=f"Todo not found: {old_title}")
-        
-        # Check if new title already exists
-        existing = db.query(models.Todo).filter(
-            models.Todo.title == new_title,
-            models.Todo.user_id == current_user.id,
-            models.Todo.id != todo.id
-        ).first()
-        
-        if existing:
-            raise HTTPException(status_code=400, detail="A todo with this title already exists")
-        
-        todo.title = new_title
+    todo = get_user_todo(db, todo_request.todo_id, current_user.id)
+    if not todo:
+        raise HTTPException(status_code=404, detail=f"Todo not found: {todo_request.todo_id}")
+
+    titles = [todo.title]
+    if todo_request.action == "update":
+        if not todo_request.new_title or not todo_request.new_title.strip():
+            raise HTTPException(status_code=400, detail="Missing todo title")
+        titles.append(todo_request.new_title.strip())
+
+    analysis = TodoAnalyzer.command_analysis(todo_request.action, ui_action, titles)
+    analysis["todos"][0]["id"] = todo.id
+    return analysis
+
+def get_user_todo(db: Session, todo_id: int, user_id: int):
+    """Get one of the user's todos by id"""
+    return db.query(models.Todo).filter(
+        models.Todo.id == todo_id,
+        models.Todo.user_id == user_id
+    ).first()
+
+def find_analysis_todo(db: Session, analysis: dict, title: str, user_id: int, any_word: bool = True):
+    """Find the todo an analysis refers to: by id for UI commands, by title for free text"""
+    todos = analysis.get("todos") or []
+    if todos and todos[0].get("id") is not None:
+        return get_user_todo(db, todos[0]["id"], user_id)
+    return find_matching_todo(db, title, user_id, any_word)
+
+def handle_create(analysis: dict, user_input: str, db: Session, current_user: models.User):
+    """Create one or more todos"""
+    try:
+        # Log the analysis for debugging
+        print(f"Analysis: {analysis}")
+        # Handle multiple todos from the analysis
+        todos_to_create = analysis.get("todos", [])
+        if not todos_to_create and "todo_info" in analysis:
+            # Fallback: create single todo from todo_info
+            todos_to_create = [{
+                "title": analysis["todo_info"]["title"],
+                "description": analysis["todo_info"]["description"],
+                "due_date": analysis["todo_info"]["due_date"],
+                "priority": analysis["todo_info"]["priority"]
+            }]
+        elif not todos_to_create:
+            todos_to_create = [{
+                "title": user_input,
+                "description": user_input,
+                "due_date": None,
+                "priority": 1
+            }]
+
+        # Create all todos in a single multi-row INSERT
+        payload = [
+            {
+                "title": todo_info["title"],
+                "description": todo_info.get("description"),
+                "user_id": current_user.id,
+                "priority": todo_info.get("priority", 1),
+                "completed": False,
+                "due_date": datetime.fromisoformat(todo_info["due_date"])
+                if todo_info.get("due_date") else None
+            }
+            for todo_info in todos_to_create
+        ]
+        created = db.scalars(insert(models.Todo).returning(models.Todo), payload).all()
+        created_todos = [serialize_todo(todo) for todo in created]
         db.commit()
-        return get_todos_response(db, "Todo updated successfully", current_user)
 
-    elif analysis["action"] in ["query", "list_all"]:
-        # Query todos
-        view_options = analysis.get("view_options", {})
-        return get_filtered_todos(db, analysis.get("filters", {}), view_options, current_user)
-    
-    elif analysis["action"] == "delete":
-        # Delete todo
-        print(f"Processing deletion: {analysis}")
-        todos = analysis.get("todos", [])
-        if not todos:
-            print("No todos found in analysis")
-            if "todo_info" in analysis:
-                todo_title = analysis["todo_info"]["title"]
-            else:
-                # Extract title from user input for deletion
-                user_input = todo_request.user_input.lower()
-                words_to_remove = ["delete", "remove", "todo", "task"]
-                for word in words_to_remove:
-                    user_input = user_input.replace(word, "")
-                todo_title = user_input.strip().capitalize()
+        count = len(created_todos)
+        return get_changed_todos_response(
+            created_todos,
+            f"Created {count} {'todo' if count == 1 else 'todos'} successfully",
+            "add_item"
+        )
+
+    except Exception as e:
+        print(f"Error creating todo: {str(e)}")
+        db.rollback()
+        return {"todos": [], "error": "Failed to create todo. Please try again."}
+
+def handle_completion(analysis: dict, user_input: str, db: Session, current_user: models.User):
+    """Mark a todo as complete or incomplete"""
+    print(f"Processing completion status: {analysis}")
+    todos = analysis.get("todos", [])
+    if not todos:
+        print("No todos found in analysis")
+        if "todo_info" in analysis:
+            todo_title = analysis["todo_info"]["title"]
         else:
-            todo_title = todos[0]["title"]
+            # Extract title from user input for completion
+            text = user_input.lower()
+            words_to_remove = ["mark", "as", "complete", "completed", "incomplete", "done", "todo", "task"]
+            for word in words_to_remove:
+                text = text.replace(word, "")
+            todo_title = text.strip().capitalize()
+    else:
+        todo_title = todos[0]["title"]
 
-        print(f"Looking for todo with title: {todo_title}")
-        todo = find_matching_todo(db, todo_title, current_user.id)
-        
-        if not todo:
-            print(f"Todo not found with title: {todo_title}")
-            raise HTTPException(status_code=404, detail=f"Todo not found: {todo_title}")
-        
-        db.delete(todo)
-        db.commit()
-        return get_todos_response(db, "Todo deleted successfully", current_user)
-    
-    raise HTTPException(status_code=400, detail="Invalid action")
+    print(f"Looking for todo with title: {todo_title}")
+    todo = find_analysis_todo(db, analysis, todo_title, current_user.id)
+
+    if not todo:
+        print(f"Todo not found with title: {todo_title}")
+        raise HTTPException(status_code=404, detail=f"Todo not found: {todo_title}")
+
+    todo.completed = analysis["action"] == "mark_complete"
+    updated_todo = serialize_todo(todo)
+    db.commit()
+    return get_changed_todos_response(
+        [updated_todo], f"Todo marked as {analysis['action'].replace('mark_', '')}", "update_item"
+    )
+
+def handle_update(analysis: dict, user_input: str, db: Session, current_user: models.User):
+    """Rename an existing todo"""
+    todos = analysis.get("todos", [])
+    if not todos or len(todos) < 2:
+        raise HTTPException(status_code=400, detail="Missing update information")
+
+    old_title = todos[0]["title"]
+    new_title = todos[1]["title"]
+
+    # Find and update the todo
+    todo = find_analysis_todo(db, analysis, old_title, current_user.id)
+    if not todo:
+        raise HTTPException(status_code=404, detail=f"Todo not found: {old_title}")
+
+    # Check if new title already exists
+    existing = db.query(models.Todo).filter(
+        models.Todo.title == new_title,
+        models.Todo.user_id == current_user.id,
+        models.Todo.id != todo.id
+    ).first()
+
+    if existing:
+        raise HTTPException(status_code=400, detail="A todo with this title already exists")
+
+    todo.title = new_title
+    updated_todo = serialize_todo(todo)
+    db.commit()
+    return get_changed_todos_response([updated_todo], "Todo updated successfully", "update_item")
+
+def handle_query(analysis: dict, user_input: str, db: Session, current_user: models.User):
+    """List todos matching the analysis filters"""
+    view_options = analysis.get("view_options", {})
+    return get_filtered_todos(db, analysis.get("filters", {}), view_options, current_user)
+
+def handle_delete(analysis: dict, user_input: str, db: Session, current_user: models.User):
+    """Delete a todo"""
+    print(f"Processing deletion: {analysis}")
+    todos = analysis.get("todos", [])
+    if not todos:
+        print("No todos found in analysis")
+        if "todo_info" in analysis:
+            todo_title = analysis["todo_info"]["title"]
+        else:
+            # Extract title from user input for deletion
+            text = user_input.lower()
+            words_to_remove = ["delete", "remove", "todo", "task"]
+            for word in words_to_remove:
+                text = text.replace(word, "")
+            todo_title = text.strip().capitalize()
+    else:
+        todo_title = todos[0]["title"]
+
+    print(f"Looking for todo with title: {todo_title}")
+    todo = find_analysis_todo(db, analysis, todo_title, current_user.id, any_word=False)
+
+    if not todo:
+        print(f"Todo not found with title: {todo_title}")
+        raise HTTPException(status_code=404, detail=f"Todo not found: {todo_title}")
+
+    deleted_todo = serialize_todo(todo)
+    db.delete(todo)
+    db.commit()
+    return get_changed_todos_response([deleted_todo], "Todo deleted successfully", "remove_item")
+
+ACTION_HANDLERS = {
+    "create": handle_create,
+    "mark_complete": handle_completion,
+    "mark_incomplete": handle_completion,
+    "update": handle_update,
+    "query": handle_query,
+    "list_all": handle_query,
+    "delete": handle_delete,
+}
+
+def get_changed_todos_response(todos: list, message: str, ui_action: str):
+    """Helper function to return only the todos changed by a request, for the client to merge"""
+    return {"todos": todos, "message": message, "ui_action": ui_action}
 
-def get_todos_response(db: Session, message: str = None, current_user: models.User = None):
-    """Helper function to return todos along with a message"""
-    todos = get_filtered_todos(db, {}, {}, current_user)
-    if message:
-        todos["message"] = message
-    return todos
+def serialize_todo(todo: models.Todo):
+    """Convert a todo to the dict returned by the API"""
+    return {
+        "id": todo.id,
+        "title": todo.title,
+        "description": todo.description,
+        "completed": todo.completed,
+        "priority": todo.priority,
+        "due_date": todo.due_date.isoformat() if todo.due_date else None,
+        "category": todo.category.name if todo.category else None,
+    }
 
 def get_filtered_todos(db: Session, filters: dict, view_options: dict, current_user: models.User = None):
     """Get filtered and sorted todos based on filters and view options"""
@@ -286,26 +377,34 @@ def get_filtered_todos(db: Session, filters: dict, view_options: dict, current_u
         if not current_user:
             return {"todos": [], "message": "Please log in to view todos"}
 
-        query = db.query(models.Todo)
+        # Select only the returned columns instead of materializing ORM objects
+        stmt = select(
+            models.Todo.id,
+            models.Todo.title,
+            models.Todo.description,
+            models.Todo.completed,
+            models.Todo.priority,
+            models.Todo.due_date,
+            models.Category.name.label("category")
+        ).select_from(models.Todo).outerjoin(models.Todo.category).order_by(models.Todo.id)
         
         # Always filter by user unless it's an admin
         if not current_user.is_admin:
-            query = query.filter(models.Todo.user_id == current_user.id)
+            stmt = stmt.where(models.Todo.user_id == current_user.id)
             
-        # Get todos and convert to dict
-        todos = query.all()
+        rows = db.execute(stmt).all()
         return {
             "todos": [
                 {
-                    "id": todo.id,
-                    "title": todo.title,
-                    "description": todo.description,
-                    "completed": todo.completed,
-                    "priority": todo.priority,
-                    "due_date": todo.due_date.isoformat() if todo.due_date else None,
-                    "category": todo.category.name if todo.category else None,
+                    "id": row.id,
+                    "title": row.title,
+                    "description": row.description,
+                    "completed": row.completed,
+                    "priority": row.priority,
+                    "due_date": row.due_date.isoformat() if row.due_date else None,
+                    "category": row.category,
                 }
-                for todo in todos
+                for row in rows
             ]
         }
     except Exception as e:
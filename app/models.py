@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -38,7 +38,13 @@ class Todo(Base):
     completed = Column(Boolean, default=False)
     priority = Column(Integer, default=1)  # 1: Low, 2: Medium, 3: High
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     category = relationship("Category", back_populates="todos")
-    user = relationship("User", back_populates="todos")
\ No newline at end of file
+    user = relationship("User", back_populates="todos")
+
+    __table_args__ = (
+        Index("ix_todos_user_completed", "user_id", "completed"),
+        Index("ix_todos_user_title", "user_id", "title"),
+        Index("ix_todos_user_due", "user_id", "due_date"),
+    )
\ No newline at end of file
@@ -0,0 +1,199 @@
+import copy
+import hashlib
+import json
+import os
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks on Windows; saves from several workers are then unserialized
+    fcntl = None
+
+try:
+    import hnswlib
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    # The semantic cache is optional; without these packages every request goes to the LLM
+    hnswlib = None
+    SentenceTransformer = None
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+CACHE_INDEX_PATH = os.getenv("SEMANTIC_CACHE_INDEX", "cache.hnsw")
+CACHE_ENTRIES_PATH = os.getenv("SEMANTIC_CACHE_ENTRIES", "cache.json")
+CACHE_LOCK_PATH = os.getenv("SEMANTIC_CACHE_LOCK", "cache.lock")
+CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+CACHE_MAX_ELEMENTS = int(os.getenv("SEMANTIC_CACHE_MAX_ELEMENTS", "10000"))
+
+# Numbers, date/time words, negations and action verbs must match exactly: embeddings place
+# "call mom at 5pm" right next to "call mom at 6pm" and "mark gym as done" next to
+# "mark gym as not done", but the cached due date or action would be wrong
+_NUMBER_RE = re.compile(r"\d+")
+_WORD_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_DATE_WORDS = frozenset({
+    "today", "tonight", "tomorrow", "yesterday", "morning", "afternoon", "evening", "night",
+    "noon", "midnight", "am", "pm", "next", "last", "this", "week", "weekend", "month", "year",
+    "minute", "minutes", "hour", "hours", "hr", "hrs", "day", "days", "weeks", "months",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december"
+})
+_NEGATION_WORDS = frozenset({
+    "not", "no", "never", "incomplete", "unfinished", "undone", "undo", "pending", "uncheck", "reopen"
+})
+_ACTION_WORDS = frozenset({
+    "add", "create", "new", "delete", "remove", "cancel", "clear", "complete", "completed", "finish",
+    "finished", "done", "mark", "rename", "change", "update", "edit", "move", "show", "list", "find"
+})
+_SIGNATURE_WORDS = _DATE_WORDS | _NEGATION_WORDS | _ACTION_WORDS
+
+
+def input_signature(user_input: str) -> List[str]:
+    """The numbers, date/time words, negations and action verbs in an input, which a cache hit must share"""
+    text = user_input.lower().replace("\u2019", "'")
+    words = []
+    for word in _WORD_RE.findall(text):
+        if word.endswith("n't"):
+            words.append("not")
+        elif word in _SIGNATURE_WORDS:
+            words.append(word)
+    return sorted(_NUMBER_RE.findall(text) + words)
+
+
+@contextmanager
+def _cache_file_lock():
+    """Hold an exclusive lock on the cache files, so workers never interleave loads and saves"""
+    if fcntl is None:
+        yield
+        return
+    with open(CACHE_LOCK_PATH, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SemanticCache:
+    """
+    Cache of parsed LLM responses keyed by a sentence embedding of the user input,
+    so paraphrased or repeated inputs skip the LLM call entirely
+    """
+
+    def __init__(self, threshold: float = CACHE_THRESHOLD):
+        self.threshold = threshold
+        self.entries: List[Dict[str, Any]] = []
+        self.model = None
+        self.index = None
+
+        if SentenceTransformer is None or hnswlib is None:
+            print("Semantic cache disabled: sentence-transformers/hnswlib not installed")
+            return
+
+        self.model = SentenceTransformer(EMBEDDING_MODEL)
+        self.index = hnswlib.Index(space="cosine", dim=EMBEDDING_DIM)
+
+        with _cache_file_lock():
+            loaded = self._load()
+        if not loaded:
+            self.entries = []
+            self.index = hnswlib.Index(space="cosine", dim=EMBEDDING_DIM)
+            self.index.init_index(max_elements=CACHE_MAX_ELEMENTS)
+
+    def _load(self) -> bool:
+        """
+        Load the saved index and entries, only if they were written together; a label in one
+        must never point at an entry from another save
+        """
+        if not (os.path.exists(CACHE_INDEX_PATH) and os.path.exists(CACHE_ENTRIES_PATH)):
+            return False
+
+        try:
+            with open(CACHE_ENTRIES_PATH) as f:
+                saved = json.load(f)
+            if not isinstance(saved, dict) or saved.get("index_digest") != _file_digest(CACHE_INDEX_PATH):
+                print("Semantic cache files do not match, starting with an empty cache")
+                return False
+
+            self.index.load_index(CACHE_INDEX_PATH, max_elements=CACHE_MAX_ELEMENTS)
+            self.entries = saved["entries"]
+        except (OSError, ValueError, KeyError, RuntimeError) as e:
+            print(f"Could not load semantic cache, starting with an empty cache: {e}")
+            return False
+
+        if len(self.entries) != self.index.get_current_count():
+            print("Semantic cache files do not match, starting with an empty cache")
+            return False
+        return True
+
+    @property
+    def enabled(self) -> bool:
+        return self.index is not None
+
+    def embed(self, user_input: str):
+        """Compute the normalized embedding for an input, or None when the cache is disabled"""
+        if not self.enabled:
+            return None
+        return self.model.encode(user_input, normalize_embeddings=True)
+
+    def lookup(self, embedding, user_input: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached response closest to the embedding, if similar enough"""
+        if embedding is None or self.index.get_current_count() == 0:
+            return None
+
+        labels, distances = self.index.knn_query(embedding, k=1)
+        # Cosine space reports distance as 1 - similarity
+        if distances[0][0] > 1 - self.threshold:
+            return None
+
+        label = int(labels[0][0])
+        if label >= len(self.entries):
+            return None
+
+        entry = self.entries[label]
+        if entry["signature"] != input_signature(user_input):
+            return None
+        return copy.deepcopy(entry["parsed"])
+
+    def add(self, embedding, user_input: str, parsed: Dict[str, Any]):
+        """Store a parsed response under the embedding of the input that produced it"""
+        if embedding is None:
+            return
+
+        if len(self.entries) >= self.index.get_max_elements():
+            self.index.resize_index(2 * self.index.get_max_elements())
+
+        self.index.add_items(embedding, [len(self.entries)])
+        self.entries.append({"signature": input_signature(user_input), "parsed": copy.deepcopy(parsed)})
+
+    def save(self):
+        """
+        Persist the index and the cached responses to disk. Both are written to temporary files
+        and moved into place, and the entries record the digest of the index they belong to
+        """
+        if not self.enabled:
+            return
+
+        index_tmp = f"{CACHE_INDEX_PATH}.{os.getpid()}.tmp"
+        entries_tmp = f"{CACHE_ENTRIES_PATH}.{os.getpid()}.tmp"
+        with _cache_file_lock():
+            self.index.save_index(index_tmp)
+            with open(entries_tmp, "w") as f:
+                json.dump({"index_digest": _file_digest(index_tmp), "entries": self.entries}, f)
+            os.replace(index_tmp, CACHE_INDEX_PATH)
+            os.replace(entries_tmp, CACHE_ENTRIES_PATH)
+
+
+semantic_cache = SemanticCache()